@@ -44,6 +44,30 @@ def batched(lst, n):
         yield lst[i:i + n]
 
 
+# Single batch round trip, split out so llm_sweep.py can replay/measure the exact same call
+def call_llm_batch(batch, client, openai_model="gpt-3.5-turbo", use_clean_text=True, temperature=0, max_tokens=2000):
+    prompt = build_batch_prompt(batch, use_clean_text=use_clean_text)
+    return client.chat.completions.create(
+        model=openai_model,
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"}
+    )
+
+
+def parse_llm_batch_output(llm_output, n_expected):
+    start = llm_output.find('[')
+    stop = llm_output.rfind(']')
+    json_text = llm_output[start:stop+1]
+    trades = json.loads(json_text)
+    if not isinstance(trades, list) or len(trades) != n_expected:
+        raise Exception("LLM response length mismatch or not an array.")
+    return trades
+
+
 ## MODEL TO BE CHANGED LATER, TOKEN SIZE TO BE INCREASED
 
 # 3. Core function to process the whole file in a single LLM call
@@ -54,24 +78,9 @@ def llm_parse_full_file_batched(input_path, output_path, client, openai_model="g
     all_structured = []
     n_messages = len(messages)
     for i, batch in enumerate(batched(messages, batch_size)):
-        prompt = build_batch_prompt(batch, use_clean_text=use_clean_text)
         try:
-            response = client.chat.completions.create(
-                model=openai_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format={"type": "json_object"}
-            )
-            llm_output = response.choices[0].message.content
-            start = llm_output.find('[')
-            stop = llm_output.rfind(']')
-            json_text = llm_output[start:stop+1]
-            trades = json.loads(json_text)
-            if not isinstance(trades, list) or len(trades) != len(batch):
-                raise Exception("LLM response length mismatch or not an array.")
+            response = call_llm_batch(batch, client, openai_model=openai_model, use_clean_text=use_clean_text, temperature=temperature, max_tokens=max_tokens)
+            trades = parse_llm_batch_output(response.choices[0].message.content, len(batch))
         except Exception as e:
             print(f"Error in OpenAI call for {input_path} (batch {i+1}/{(n_messages+batch_size-1)//batch_size}):", e)
             trades = [None] * len(batch)
@@ -0,0 +1,120 @@
+import json
+
+import pandas as pd
+
+# Trade filters offered by the dashboard and rendered by the batch report.
+TRADE_FILTERS = [
+    "Calls Bought",
+    "Puts Sold",
+    "Both (Calls Bought & Puts Sold)"
+]
+
+
+def load_trades(path):
+    """
+    Loads a *_deduped.json file into a DataFrame.
+    Null entries and anything that isn't a dict (LLM junk) are dropped.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+        # filter out None/null entries (if LLM output has many nulls)
+        filtered = [x for x in raw if x is not None]
+        # (Optional: filter again if any items are not dict)
+        filtered = [x for x in filtered if isinstance(x, dict)]
+    df = pd.DataFrame(filtered)
+    return df
+
+
+def get_tickers(df):
+    """
+    Sorted list of tickers present in the trades DataFrame.
+    Non-string tickers (numbers, lists... LLM junk) are dropped.
+    """
+    if "ticker" not in df.columns:
+        return []
+    return sorted({t for t in df["ticker"].dropna() if isinstance(t, str) and t.strip()})
+
+
+def filter_trades(df, ticker, trade_type):
+    """
+    Returns the trades for one ticker matching trade_type (one of TRADE_FILTERS).
+    """
+    # Older LLM outputs don't always have every column
+    if df.empty or not {"ticker", "type", "direction"}.issubset(df.columns):
+        return df.iloc[0:0]
+
+    # .astype(str) so a None direction doesn't poison the boolean mask
+    is_call = df["type"].astype(str).str.lower() == "call"
+    is_put = df["type"].astype(str).str.lower() == "put"
+    is_buy = df["direction"].astype(str).str.lower().str.startswith("buy")
+    is_sell = df["direction"].astype(str).str.lower().str.startswith("sell")
+
+    if trade_type == "Calls Bought":
+        mask = is_call & is_buy
+    elif trade_type == "Puts Sold":
+        mask = is_put & is_sell
+    else:
+        # Both — union of calls bought and puts sold
+        mask = (is_call & is_buy) | (is_put & is_sell)
+
+    return df[(df["ticker"] == ticker) & mask]
+
+
+def build_heatmap_data(filtered):
+    """
+    Pivots filtered trades into a strike x expiry grid of summed size.
+    Returns an empty DataFrame if nothing has a numeric strike and size plus an expiry.
+    """
+    if not {"strike", "expiry", "size"}.issubset(filtered.columns):
+        return pd.DataFrame()
+
+    matrix_df = filtered.copy()
+
+    # Strikes/sizes straight from the LLM can be things like "500/510" or "50mm" -> NaN, dropped below
+    matrix_df["strike"] = pd.to_numeric(matrix_df["strike"], errors="coerce")
+    matrix_df["size"] = pd.to_numeric(matrix_df["size"], errors="coerce")
+
+    # Remove trades missing (or with unparseable) strike, expiry or size (since can't plot these)
+    matrix_df = matrix_df.dropna(subset=["strike", "expiry", "size"])
+    if matrix_df.empty:
+        return pd.DataFrame()
+
+    # Make expiry a string for axis labeling
+    matrix_df["expiry"] = matrix_df["expiry"].astype(str)
+
+    heatmap_data = matrix_df.pivot_table(
+        index="strike",
+        columns="expiry",
+        values="size",
+        aggfunc="sum",
+        fill_value=0
+    )
+    return heatmap_data
+
+
+def plot_heatmap(heatmap_data, trade_type, title=None):
+    """
+    Draws the expiry x strike heatmap and returns the matplotlib figure.
+    title overrides the default axes title. Caller is responsible for closing it.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(1.5 + heatmap_data.shape[1], 6))
+
+    sns.heatmap(
+        heatmap_data,
+        cmap="viridis",
+        annot=True,
+        fmt=".0f",
+        linewidths=0.5,
+        cbar=True,
+        ax=ax
+    )
+
+    ax.set_xlabel("Expiry")
+    ax.set_ylabel("Strike")
+    ax.set_title(title or f"Total size traded ({trade_type}) per expiry-strike")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    fig.tight_layout()
+    return fig
@@ -28,10 +28,19 @@ Heatmap plot: X = expiry, Y = strike, Cell = sum(size) (or count, but size prefe
 
 
 import streamlit as st
-import pandas as pd
 import os
 import glob
-import json
+
+from flow_heatmap import (
+    TRADE_FILTERS,
+    load_trades,
+    get_tickers,
+    filter_trades,
+    build_heatmap_data,
+    plot_heatmap,
+)
+# Aggregation/plotting lives in flow_heatmap.py so flow_report.py can render the same heatmaps headless.
+
 # --- Step 1: Find latest deduped file in the given folder ---
 
 @st.cache_data
@@ -55,14 +64,7 @@ st.success(f"Loaded latest deduped file: {os.path.basename(latest_file)}")
 
 @st.cache_data
 def load_data(path):
-    with open(path) as f:
-        raw = json.load(f)
-        # filter out None/null entries (if LLM output has many nulls)
-        filtered = [x for x in raw if x is not None]
-        # (Optional: filter again if any items are not dict)
-        filtered = [x for x in filtered if isinstance(x, dict)]
-    df = pd.DataFrame(filtered)
-    return df
+    return load_trades(path)
 
 df = load_data(latest_file)
 
@@ -73,17 +75,13 @@ df = load_data(latest_file)
 st.sidebar.header("Trade Filters")
 
 # Get available tickers from data.
-tickers = sorted(df["ticker"].dropna().unique().tolist())
+tickers = get_tickers(df)
 selected_ticker = st.sidebar.selectbox("Select Ticker", tickers, index=0)
 
 # Trade type filter: 'Calls bought', 'Puts sold', or 'Both'
 trade_type = st.sidebar.radio(
     "Show:",
-    [
-        "Calls Bought",
-        "Puts Sold",
-        "Both (Calls Bought & Puts Sold)"
-    ],
+    TRADE_FILTERS,
     index=0
 )
 
@@ -91,28 +89,7 @@ trade_type = st.sidebar.radio(
 
 # --- Step 3: Filter the DataFrame based on sidebar selections ---
 
-if trade_type == "Calls Bought":
-    filtered = df[
-        (df["ticker"] == selected_ticker) &
-        (df["type"].str.lower() == "call") &
-        (df["direction"].str.lower().str.startswith("buy"))
-    ]
-elif trade_type == "Puts Sold":
-    filtered = df[
-        (df["ticker"] == selected_ticker) &
-        (df["type"].str.lower() == "put") &
-        (df["direction"].str.lower().str.startswith("sell"))
-    ]
-else:
-    # Both — union of calls bought and puts sold
-    filtered = df[
-        (df["ticker"] == selected_ticker) &
-        (
-            ((df["type"].str.lower() == "call") & (df["direction"].str.lower().str.startswith("buy")))
-            |
-            ((df["type"].str.lower() == "put") & (df["direction"].str.lower().str.startswith("sell")))
-        )
-    ]
+filtered = filter_trades(df, selected_ticker, trade_type)
 
 st.info(f"Found {len(filtered)} matching trades for {selected_ticker} ({trade_type})")
 
@@ -122,57 +99,19 @@ if filtered.empty:
 
 
 
+# --- Step 2A/2B: Clean strike/expiry and pivot ("Heatmap data") ---
 
-import numpy as np
-
-# --- Step 2A: Ensure strike and expiry columns are clean (if present) ---
-
-# Remove trades missing either strike or expiry (since can't plot these)
-matrix_df = filtered.dropna(subset=["strike", "expiry", "size"]).copy()
-
-# Convert strikes to float (optional, for sort/order/heatmap axis)
-matrix_df["strike"] = matrix_df["strike"].astype(float)
-
-# Make expiry a string for axis labeling
-matrix_df["expiry"] = matrix_df["expiry"].astype(str)
+heatmap_data = build_heatmap_data(filtered)
 
-if matrix_df.empty:
+if heatmap_data.empty:
     st.warning("No trades with both expiry and strike for this filter. Pick a new filter/ticker.")
     st.stop()
 
-# --- Step 2B: Pivot table ("Heatmap data") ---
 
-heatmap_data = matrix_df.pivot_table(
-    index="strike",
-    columns="expiry",
-    values="size",
-    aggfunc="sum",
-    fill_value=0
-)
-
-
-
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 st.subheader(f"Expiry × Strike Size Heatmap — {selected_ticker} ({trade_type})")
 
-fig, ax = plt.subplots(figsize=(1.5 + heatmap_data.shape[1], 6))
-
-sns.heatmap(
-    heatmap_data,
-    cmap="viridis",
-    annot=True,
-    fmt=".0f",
-    linewidths=0.5,
-    cbar=True,
-    ax=ax
-)
-
-ax.set_xlabel("Expiry")
-ax.set_ylabel("Strike")
-ax.set_title(f"Total size traded ({trade_type}) per expiry-strike")
-plt.xticks(rotation=45, ha='right')
+fig = plot_heatmap(heatmap_data, trade_type)
 
 st.pyplot(fig)
 
@@ -0,0 +1,304 @@
+'''Headless batch report: renders every ticker x trade filter heatmap for a day (or date range)
+of deduped trades into static PNG + HTML, so the morning pack doesn't need anyone clicking
+through the Streamlit sidebar.
+
+Output layout:
+reports/
+  20250729/
+    index.html            # every heatmap for the day + underlying tables
+    SPY_calls_bought.png
+    ...
+    manifest.json         # content hash per heatmap, used to skip unchanged renders
+
+Run:
+python flow_report.py                       # latest day in ./deduped_trades
+python flow_report.py --date 20250729
+python flow_report.py --start 20250701 --end 20250731 --workers 8
+'''
+
+import os
+import re
+import glob
+import json
+import hashlib
+import argparse
+import html
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # no display in the worker processes
+
+from flow_heatmap import (
+    TRADE_FILTERS,
+    load_trades,
+    get_tickers,
+    filter_trades,
+    build_heatmap_data,
+    plot_heatmap,
+)
+
+# Bump this when plot_heatmap changes so old PNGs get re-rendered.
+RENDER_VERSION = 1
+
+DEDUPED_FILE_RE = re.compile(r'^(\d{8})_deduped\.json$')
+
+
+def filter_slug(trade_type):
+    """
+    'Calls Bought' -> 'calls_bought', 'Both (Calls Bought & Puts Sold)' -> 'both'
+    """
+    if trade_type.startswith("Both"):
+        return "both"
+    return trade_type.lower().replace(" ", "_")
+
+
+def ticker_slug(ticker, taken):
+    """
+    Filesystem-safe version of an (LLM-extracted) ticker, e.g. 'BRK/B' -> 'BRK_B'.
+    taken maps slug -> ticker already using it; collisions get a numeric suffix.
+    """
+    base = re.sub(r'[^A-Za-z0-9_.-]', '_', str(ticker)).lstrip('.') or '_'
+    slug, n = base, 2
+    while slug in taken and taken[slug] != ticker:
+        slug = f"{base}_{n}"
+        n += 1
+    taken[slug] = ticker
+    return slug
+
+
+def find_deduped_files(folder, start_date=None, end_date=None):
+    """
+    Returns [(date_str, path), ...] for YYYYMMDD_deduped.json files in folder, sorted by date.
+    start_date/end_date are inclusive YYYYMMDD strings; None means open-ended.
+    """
+    days = []
+    for path in glob.glob(os.path.join(folder, "*_deduped.json")):
+        match = DEDUPED_FILE_RE.match(os.path.basename(path))
+        if not match:
+            continue
+        date_str = match.group(1)
+        if start_date and date_str < start_date:
+            continue
+        if end_date and date_str > end_date:
+            continue
+        days.append((date_str, path))
+    return sorted(days)
+
+
+def heatmap_digest(heatmap_data, title):
+    """
+    Hash of exactly what ends up in the PNG. If this matches the manifest the render is skipped.
+    """
+    payload = json.dumps({
+        "version": RENDER_VERSION,
+        "title": title,
+        "data": heatmap_data.to_json(orient="split"),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_heatmap_png(heatmap_data, trade_type, title, png_path):
+    """
+    Worker: draws one heatmap and saves it. Runs in a separate process.
+    """
+    import matplotlib.pyplot as plt
+
+    fig = plot_heatmap(heatmap_data, trade_type, title=title)
+    fig.savefig(png_path, dpi=100, bbox_inches="tight")
+    plt.close(fig)
+    return png_path
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Corrupt/partial manifest: just re-render everything
+        return {}
+
+
+def build_day_jobs(date_str, input_path, day_dir):
+    """
+    Filters + pivots every ticker x filter for one day (cheap, done in the parent).
+    Returns list of job dicts; heatmap_data is None when there's nothing to plot.
+    """
+    df = load_trades(input_path)
+    jobs = []
+    tickers = get_tickers(df)
+    # Tickers that are already safe keep their own name; only rewritten ones get suffixed on collision
+    slugs = {}
+    slug_for = {}
+    for ticker in sorted(tickers, key=lambda t: (ticker_slug(t, {}) != t, t)):
+        slug_for[ticker] = ticker_slug(ticker, slugs)
+    for ticker in tickers:
+        slug = slug_for[ticker]
+        for trade_type in TRADE_FILTERS:
+            try:
+                filtered = filter_trades(df, ticker, trade_type)
+                heatmap_data = build_heatmap_data(filtered)
+            except Exception as e:
+                # One bad cell shouldn't take down the rest of the pack
+                print(f"Error building {ticker} ({trade_type}) for {date_str}:", e)
+                continue
+            key = f"{slug}_{filter_slug(trade_type)}"
+            title = f"{ticker} — {date_str}\n{trade_type}"
+            job = {
+                "key": key,
+                "ticker": ticker,
+                "trade_type": trade_type,
+                "title": title,
+                "n_trades": len(filtered),
+                "heatmap_data": None,
+                "digest": None,
+                "png_path": os.path.join(day_dir, key + ".png"),
+            }
+            if not heatmap_data.empty:
+                job["heatmap_data"] = heatmap_data
+                job["digest"] = heatmap_digest(heatmap_data, title)
+            jobs.append(job)
+    return jobs
+
+
+def write_day_index(date_str, input_path, day_dir, jobs, failed=()):
+    """
+    Writes index.html for the day: one section per ticker, one heatmap + table per filter.
+    failed holds png paths whose render failed; those get a note instead of a broken image.
+    """
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset='utf-8'>",
+        f"<title>Flow heatmaps {date_str}</title>",
+        "<style>body{font-family:sans-serif;margin:20px} table{border-collapse:collapse;font-size:12px}"
+        " td,th{border:1px solid #ccc;padding:2px 6px;text-align:right} .empty{color:#888}</style>",
+        "</head><body>",
+        f"<h1>Expiry × Strike Size Heatmaps — {date_str}</h1>",
+        f"<p>Source: {html.escape(os.path.basename(input_path))}</p>",
+    ]
+    tickers = sorted({job["ticker"] for job in jobs})
+    parts.append("<p>" + " | ".join(
+        f"<a href='#{html.escape(t)}'>{html.escape(t)}</a>" for t in tickers
+    ) + "</p>")
+
+    for ticker in tickers:
+        parts.append(f"<h2 id='{html.escape(ticker)}'>{html.escape(ticker)}</h2>")
+        for job in jobs:
+            if job["ticker"] != ticker:
+                continue
+            parts.append(f"<h3>{html.escape(job['trade_type'])}</h3>")
+            if job["heatmap_data"] is None:
+                parts.append(
+                    f"<p class='empty'>Found {job['n_trades']} matching trades — "
+                    "nothing with expiry, strike and size to plot.</p>"
+                )
+                continue
+            parts.append(f"<p>Found {job['n_trades']} matching trades</p>")
+            if job["png_path"] in failed:
+                parts.append("<p class='empty'>Render failed — see the report log. Retried on the next run.</p>")
+            else:
+                parts.append(f"<img src='{html.escape(os.path.basename(job['png_path']))}'>")
+            parts.append("<details><summary>Show underlying data table</summary>")
+            parts.append(job["heatmap_data"].to_html())
+            parts.append("</details>")
+
+    parts.append("</body></html>")
+    with open(os.path.join(day_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write("\n".join(parts))
+
+
+def generate_reports(input_folder="./deduped_trades", output_folder="./reports",
+                     start_date=None, end_date=None, workers=None, force=False):
+    """
+    Renders heatmaps for every deduped day in [start_date, end_date] using a process pool.
+    Heatmaps whose data hash matches the day's manifest (and whose PNG exists) are skipped.
+    """
+    days = find_deduped_files(input_folder, start_date, end_date)
+    print(f"\nFound {len(days)} deduped files in {input_folder}\n")
+    if not days:
+        return
+
+    day_jobs = []
+    to_render = []
+    for date_str, input_path in days:
+        day_dir = os.path.join(output_folder, date_str)
+        try:
+            jobs = build_day_jobs(date_str, input_path, day_dir)
+        except Exception as e:
+            # Corrupt/partial day file: skip the day (its old report is left as-is), keep the rest of the range
+            print(f"Error loading {input_path}, skipping {date_str}:", e)
+            continue
+        if not os.path.exists(day_dir):
+            os.makedirs(day_dir)
+        manifest = {} if force else load_manifest(os.path.join(day_dir, "manifest.json"))
+        for job in jobs:
+            if job["heatmap_data"] is None:
+                continue
+            if manifest.get(job["key"]) == job["digest"] and os.path.isfile(job["png_path"]):
+                continue
+            to_render.append(job)
+        day_jobs.append((date_str, input_path, day_dir, jobs))
+
+    n_plottable = sum(1 for _, _, _, jobs in day_jobs for j in jobs if j["heatmap_data"] is not None)
+    print(f"{len(to_render)} heatmaps to render, {n_plottable - len(to_render)} unchanged (skipped)")
+
+    failed = set()
+    if to_render:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(render_heatmap_png, j["heatmap_data"], j["trade_type"], j["title"], j["png_path"]): j
+                for j in to_render
+            }
+            for future, job in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error rendering {job['title']}:", e)
+                    failed.add(job["png_path"])
+
+    for date_str, input_path, day_dir, jobs in day_jobs:
+        # Failed renders are left out of the manifest so the next run retries them
+        manifest = {
+            j["key"]: j["digest"] for j in jobs
+            if j["heatmap_data"] is not None and j["png_path"] not in failed
+        }
+        with open(os.path.join(day_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        # Drop PNGs for tickers/filters no longer in the day (or whose render just failed)
+        for png_path in glob.glob(os.path.join(day_dir, "*.png")):
+            key = os.path.splitext(os.path.basename(png_path))[0]
+            if key not in manifest and os.path.isfile(png_path):
+                os.remove(png_path)
+        write_day_index(date_str, input_path, day_dir, jobs, failed)
+        print(f"✅ Report: {input_path} => {os.path.join(day_dir, 'index.html')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render all ticker x filter flow heatmaps to static HTML/PNG.")
+    parser.add_argument("--input-folder", default="./deduped_trades")
+    parser.add_argument("--output-folder", default="./reports")
+    parser.add_argument("--date", help="Single day, YYYYMMDD")
+    parser.add_argument("--start", help="First day of range, YYYYMMDD (inclusive)")
+    parser.add_argument("--end", help="Last day of range, YYYYMMDD (inclusive)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-render even if the data hasn't changed")
+    args = parser.parse_args()
+
+    start_date, end_date = args.start, args.end
+    if args.date:
+        start_date = end_date = args.date
+    elif not (start_date or end_date):
+        # Like the dashboard, default to just the latest day
+        days = find_deduped_files(args.input_folder)
+        if days:
+            start_date = end_date = days[-1][0]
+
+    generate_reports(
+        input_folder=args.input_folder,
+        output_folder=args.output_folder,
+        start_date=start_date,
+        end_date=end_date,
+        workers=args.workers,
+        force=args.force
+    )
@@ -0,0 +1,416 @@
+'''Sweep harness for the LLM stage (Step 3): tries batch_size / max_tokens / openai_model / use_clean_text
+combinations over a golden set and reports throughput vs accuracy for each.
+
+Golden set = every input file that has an output in /llm_parsed (messages come from /preprocessed or
+/structured), labelled with that day's /deduped_trades/YYYYMMDD_deduped.json. Each config runs the same
+batches LLM_parser.py would, then dedupes like Step 4 and compares against the labels.
+
+The API is never hit during a normal sweep: responses are replayed from a recording file keyed by the
+exact request (model, max_tokens, temperature, prompt). Record once with --record (needs OPENAI_API_KEY),
+then replay as often as you like. A batch with no recording counts as a failed batch ("unrecorded").
+
+Run:
+python llm_sweep.py --record        # hits OpenAI for any request not already recorded
+python llm_sweep.py                 # replay only, prints the table
+'''
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from types import SimpleNamespace
+
+from LLM_parser import batched, call_llm_batch, parse_llm_batch_output
+from duplication_removal import FINGERPRINT_FIELDS, make_trade_fingerprint
+
+# Values currently hand-picked across LLM_parser.py (25/40, 2000/2400) and LLM_Batching (50, 2048).
+SWEEP_GRID = {
+    "batch_size": [25, 40, 50],
+    "max_tokens": [2000, 2400],
+    "openai_model": ["gpt-3.5-turbo", "gpt-4o"],
+    "use_clean_text": [True, False],
+}
+
+# Fields scored for field-level accuracy (dedup fields + size, which the heatmap sums).
+# ticker is left out: it's what predictions are matched on, so it would always count as correct.
+SCORED_FIELDS = [f for f in FINGERPRINT_FIELDS if f != "ticker"] + ["size"]
+
+
+##################################################################################################################
+# Recorded-response backend: same .chat.completions.create() shape as openai.OpenAI, so call_llm_batch
+# doesn't know the difference.
+
+def request_key(kwargs):
+    payload = json.dumps({
+        "model": kwargs.get("model"),
+        "max_tokens": kwargs.get("max_tokens"),
+        "temperature": kwargs.get("temperature"),
+        "messages": kwargs.get("messages"),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_response(record):
+    usage = SimpleNamespace(
+        prompt_tokens=record.get("prompt_tokens", 0),
+        completion_tokens=record.get("completion_tokens", 0),
+    )
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=record["content"]))],
+        usage=usage,
+        latency_s=record.get("latency_s", 0.0),
+    )
+
+
+class UnrecordedRequest(Exception):
+    pass
+
+
+class ReplayClient:
+    """
+    Serves responses out of a recordings JSON file. If wrapped_client is given, anything not yet
+    recorded is sent to it (real API), timed, and added to the recordings (call save() after).
+    """
+
+    def __init__(self, recordings_path, wrapped_client=None):
+        self.recordings_path = recordings_path
+        self.wrapped_client = wrapped_client
+        self.recordings = {}
+        if os.path.exists(recordings_path):
+            with open(recordings_path, 'r', encoding='utf-8') as f:
+                self.recordings = json.load(f)
+        self.n_new = 0
+        # mimic client.chat.completions.create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        key = request_key(kwargs)
+        if key in self.recordings:
+            return make_response(self.recordings[key])
+        if self.wrapped_client is None:
+            raise UnrecordedRequest(f"no recorded response for request {key[:12]}")
+
+        t0 = time.perf_counter()
+        response = self.wrapped_client.chat.completions.create(**kwargs)
+        latency_s = time.perf_counter() - t0
+        usage = getattr(response, "usage", None)
+        record = {
+            "model": kwargs.get("model"),
+            "max_tokens": kwargs.get("max_tokens"),
+            "content": response.choices[0].message.content or "",
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) if usage else 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) if usage else 0,
+            "latency_s": latency_s,
+        }
+        self.recordings[key] = record
+        self.n_new += 1
+        return make_response(record)
+
+    def save(self):
+        folder = os.path.dirname(self.recordings_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.recordings_path, 'w', encoding='utf-8') as f:
+            json.dump(self.recordings, f, indent=2, ensure_ascii=False)
+
+
+##################################################################################################################
+# Golden set
+
+def unique_trades(trades):
+    """
+    Same as duplication_removal.dedupe_trades (first occurrence per fingerprint wins), minus the
+    per-call print, which would otherwise fire for every day of every config.
+    """
+    seen = set()
+    unique = []
+    for trade in trades:
+        fp = make_trade_fingerprint(trade)
+        if fp not in seen:
+            seen.add(fp)
+            unique.append(trade)
+    return unique
+
+
+def find_input_file(base, input_folders):
+    for folder in input_folders:
+        for suffix in ("_preproc.json", "_structured.json"):
+            path = os.path.join(folder, base + suffix)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def build_golden_set(llm_folder="./llm_parsed", deduped_folder="./deduped_trades",
+                     input_folders=("./preprocessed", "./structured")):
+    """
+    Groups labelled input files by day: {date_str: {"files": [(base, messages)], "trades": [...]}}.
+    A file is only used if it has an _llm.json, a matching input file and a deduped file for its date.
+    Labels go through the same dedupe as predictions, since older deduped files predate Step 4's fingerprint.
+    """
+    golden = {}
+    for fname in sorted(os.listdir(llm_folder)):
+        if not fname.endswith('_llm.json'):
+            continue
+        base = fname[:-len('_llm.json')]
+        match = re.search(r'(\d{8})', base)
+        if not match:
+            print(f"Skipping {fname}: no YYYYMMDD date in name")
+            continue
+        date_str = match.group(1)
+        deduped_path = os.path.join(deduped_folder, f"{date_str}_deduped.json")
+        input_path = find_input_file(base, input_folders)
+        if not os.path.exists(deduped_path) or input_path is None:
+            print(f"Skipping {fname}: missing deduped file or input messages")
+            continue
+
+        with open(input_path, 'r', encoding='utf-8') as f:
+            messages = json.load(f)
+        if date_str not in golden:
+            with open(deduped_path, 'r', encoding='utf-8') as f:
+                trades = unique_trades(t for t in json.load(f) if isinstance(t, dict))
+            golden[date_str] = {"files": [], "trades": trades}
+        golden[date_str]["files"].append((base, messages))
+
+    n_files = sum(len(day["files"]) for day in golden.values())
+    n_trades = sum(len(day["trades"]) for day in golden.values())
+    print(f"Golden set: {len(golden)} days, {n_files} files, {n_trades} labelled trades")
+    return golden
+
+
+##################################################################################################################
+# Scoring
+
+def norm_field(val):
+    """
+    Normalizes a field for comparison: 620 == 620.0 == "620", case/whitespace-insensitive.
+    """
+    if val is None:
+        return ''
+    if isinstance(val, str):
+        val = val.strip().lower()
+    try:
+        return repr(float(val))
+    except (TypeError, ValueError):
+        return str(val).lower()
+
+
+def score_trades(predicted, golden):
+    """
+    Scores deduped predicted trades against deduped golden trades. Returns raw counts so days can be pooled.
+    Trades with the same Step 4 fingerprint are paired first; each remaining golden trade is then matched
+    (greedily, same ticker) to the unused predicted trade agreeing on the most SCORED_FIELDS.
+    Field accuracy = agreeing fields / golden fields; trade recall/precision use exact fingerprints.
+    """
+    predicted_by_fp = {make_trade_fingerprint(t): t for t in predicted}
+    unused = list(predicted)
+    leftover = []
+    n_fields = 0
+    n_correct = 0
+    hits = 0
+    for g in golden:
+        fields = [f for f in SCORED_FIELDS if g.get(f) is not None]
+        n_fields += len(fields)
+        p = predicted_by_fp.get(make_trade_fingerprint(g))
+        if p is None:
+            leftover.append((g, fields))
+            continue
+        hits += 1
+        unused.remove(p)
+        n_correct += sum(norm_field(p.get(f)) == norm_field(g.get(f)) for f in fields)
+
+    for g, fields in leftover:
+        best, best_score = None, -1
+        for p in unused:
+            if norm_field(p.get("ticker")) != norm_field(g.get("ticker")):
+                continue
+            score = sum(norm_field(p.get(f)) == norm_field(g.get(f)) for f in fields)
+            if score > best_score:
+                best, best_score = p, score
+        if best is not None:
+            unused.remove(best)
+            n_correct += best_score
+
+    return {
+        "fields": n_fields,
+        "fields_correct": n_correct,
+        "golden_trades": len(golden),
+        "predicted_trades": len(predicted),
+        "matched_trades": hits,
+    }
+
+
+def summarize_scores(counts):
+    """
+    Turns pooled score_trades counts into field_accuracy / trade_recall / trade_precision / trade_f1.
+    Everything is weighted the same way (pooled over all days), so one row's numbers are comparable.
+    """
+    accuracy = counts["fields_correct"] / counts["fields"] if counts["fields"] else 0.0
+    recall = counts["matched_trades"] / counts["golden_trades"] if counts["golden_trades"] else 0.0
+    precision = counts["matched_trades"] / counts["predicted_trades"] if counts["predicted_trades"] else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "field_accuracy": accuracy,
+        "trade_recall": recall,
+        "trade_precision": precision,
+        "trade_f1": f1,
+    }
+
+
+def check_golden_set(golden):
+    """
+    Sanity check: feeding the labels back as predictions must score a perfect 1.0 on every metric,
+    otherwise the scoring (not the model) is what's limiting the sweep.
+    """
+    for date_str, day in golden.items():
+        scores = summarize_scores(score_trades(day["trades"], day["trades"]))
+        bad = {k: v for k, v in scores.items() if v != 1.0}
+        if day["trades"] and bad:
+            raise ValueError(f"Golden set for {date_str} doesn't score 1.0 against itself: {bad}")
+
+
+##################################################################################################################
+# Sweep
+
+def run_config(golden, client, batch_size, max_tokens, openai_model, use_clean_text, temperature=0):
+    """
+    Runs one configuration over the golden set. Throughput and tokens only count batches that got a
+    response, and use the recorded API latency so replayed numbers match what the live run measured.
+    """
+    n_messages = n_answered = n_batches = n_failed = n_unrecorded = 0
+    tokens = 0
+    latency_s = 0.0
+    counts = {"fields": 0, "fields_correct": 0, "golden_trades": 0, "predicted_trades": 0, "matched_trades": 0}
+
+    for date_str, day in sorted(golden.items()):
+        predicted = []
+        for base, messages in day["files"]:
+            for batch in batched(messages, batch_size):
+                n_batches += 1
+                n_messages += len(batch)
+                try:
+                    response = call_llm_batch(batch, client, openai_model=openai_model, use_clean_text=use_clean_text, temperature=temperature, max_tokens=max_tokens)
+                except UnrecordedRequest:
+                    n_failed += 1
+                    n_unrecorded += 1
+                    continue
+                except Exception as e:
+                    print(f"Error in OpenAI call for {base}:", e)
+                    n_failed += 1
+                    continue
+
+                n_answered += len(batch)
+                latency_s += getattr(response, "latency_s", 0.0)
+                if response.usage is not None:
+                    tokens += response.usage.prompt_tokens + response.usage.completion_tokens
+                try:
+                    trades = parse_llm_batch_output(response.choices[0].message.content, len(batch))
+                except Exception:
+                    n_failed += 1
+                    continue
+                predicted.extend(t for t in trades if isinstance(t, dict))
+
+        day_counts = score_trades(unique_trades(predicted), day["trades"])
+        for k in counts:
+            counts[k] += day_counts[k]
+
+    result = {
+        "batch_size": batch_size,
+        "max_tokens": max_tokens,
+        "openai_model": openai_model,
+        "use_clean_text": use_clean_text,
+        "messages": n_messages,
+        "batches": n_batches,
+        "failed_batches": n_failed,
+        "unrecorded_batches": n_unrecorded,
+        "failed_batch_rate": n_failed / n_batches if n_batches else 0.0,
+        "messages_per_sec": n_answered / latency_s if latency_s > 0 else 0.0,
+        "tokens_per_message": tokens / n_answered if n_answered else 0.0,
+    }
+    result.update(summarize_scores(counts))
+    return result
+
+
+def run_sweep(golden, client, grid=SWEEP_GRID):
+    keys = list(grid)
+    results = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        config = dict(zip(keys, values))
+        print(f"\nRunning {config}")
+        results.append(run_config(golden, client, **config))
+    return results
+
+
+def pick_best(results, min_accuracy=0.9, min_precision=0.8, max_failed_rate=0.1):
+    """
+    Fastest config (messages/sec) among those meeting the accuracy, trade precision and failed-batch bars.
+    The precision bar stops a config that pads its output with made-up trades from winning.
+    Returns None if nothing qualifies (or nothing was recorded).
+    """
+    ok = [
+        r for r in results
+        if r["unrecorded_batches"] == 0
+        and r["field_accuracy"] >= min_accuracy
+        and r["trade_precision"] >= min_precision
+        and r["failed_batch_rate"] <= max_failed_rate
+    ]
+    if not ok:
+        return None
+    return max(ok, key=lambda r: (r["messages_per_sec"], r["field_accuracy"]))
+
+
+def print_results(results, best):
+    header = f"{'':1} {'model':<16}{'batch':>6}{'max_tok':>8}{'clean':>6}{'msg/s':>10}{'tok/msg':>9}{'fail%':>7}{'unrec':>6}{'field_acc':>10}{'recall':>8}{'prec':>7}{'f1':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: -r["messages_per_sec"]):
+        mark = "*" if r is best else ""
+        print(
+            f"{mark:1} {r['openai_model']:<16}{r['batch_size']:>6}{r['max_tokens']:>8}{str(r['use_clean_text'])[0]:>6}"
+            f"{r['messages_per_sec']:>10.1f}{r['tokens_per_message']:>9.1f}{100 * r['failed_batch_rate']:>6.1f}%"
+            f"{r['unrecorded_batches']:>6}{r['field_accuracy']:>10.3f}{r['trade_recall']:>8.3f}{r['trade_precision']:>7.3f}{r['trade_f1']:>7.3f}"
+        )
+    if best:
+        print(f"\n* Best throughput at acceptable quality: model={best['openai_model']} batch_size={best['batch_size']} "
+              f"max_tokens={best['max_tokens']} use_clean_text={best['use_clean_text']}")
+    else:
+        print("\nNo fully-recorded config met the accuracy/precision/failure bars. Record more (--record) or relax --min-accuracy / --min-precision.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep LLM batch settings against a golden set using recorded responses.")
+    parser.add_argument("--recordings", default="./llm_recordings/responses.json")
+    parser.add_argument("--record", action="store_true", help="Call OpenAI for unrecorded requests and save them")
+    parser.add_argument("--min-accuracy", type=float, default=0.9)
+    parser.add_argument("--min-precision", type=float, default=0.8)
+    parser.add_argument("--max-failed-rate", type=float, default=0.1)
+    parser.add_argument("--output", default=None, help="Optional path to write all results as JSON")
+    args = parser.parse_args()
+
+    golden = build_golden_set()
+    check_golden_set(golden)
+
+    wrapped_client = None
+    if args.record:
+        import openai
+        # Reads OPENAI_API_KEY from the environment
+        wrapped_client = openai.OpenAI()
+    client = ReplayClient(args.recordings, wrapped_client=wrapped_client)
+
+    try:
+        results = run_sweep(golden, client)
+    finally:
+        if client.n_new:
+            client.save()
+            print(f"\nRecorded {client.n_new} new responses to {args.recordings}")
+
+    best = pick_best(results, min_accuracy=args.min_accuracy, min_precision=args.min_precision, max_failed_rate=args.max_failed_rate)
+    print_results(results, best)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"results": results, "best": best}, f, indent=2)
+        print(f"✅ Results written to {args.output}")